@@ -2,23 +2,68 @@
 """SafeAlter CLI — catch backward-incompatible schema changes before deploy."""
 import argparse
 import json
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from safealter import parse_migrations, find_violations, to_sarif, to_json
+from safealter import (IO_WORKERS, default_cache_dir, iter_violations_paths, parse_migrations, read_source,
+                       to_json, to_sarif)
 
 CODE_EXTS = {".py", ".sql", ".go", ".java", ".ts", ".js", ".rb", ".kt", ".rs"}
 
 
-def collect(paths, exts=None):
-    """Recursively collect file contents from paths."""
-    files = {}
+def _walk(root, exts=None):
+    """Yield file paths below root with a suffix in exts.
+
+    os.scandir dirent types answer the dir/file checks without a stat per
+    entry, and the suffix is tested on the name before asking at all.
+    Directories that cannot be listed are skipped.
+    """
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue  # unreadable or vanished directory: skip it, as rglob did
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif (exts is None or os.path.splitext(entry.name)[1] in exts) and entry.is_file():
+                    yield entry.path
+
+
+def discover(paths, exts=None):
+    """Recursively list files under paths, keeping those with a suffix in exts."""
+    found = []
     for p in paths:
         pp = Path(p)
-        targets = pp.rglob("*") if pp.is_dir() else [pp]
-        for f in targets:
-            if f.is_file() and (exts is None or f.suffix in exts):
-                files[str(f)] = f.read_text(errors="ignore")
-    return files
+        if pp.is_dir():
+            found.extend(_walk(str(pp), exts))
+        elif pp.is_file() and (exts is None or pp.suffix in exts):
+            found.append(str(pp))
+    # Overlapping arguments (a directory plus files inside it, as pre-commit
+    # passes them) must not scan, and so report, the same file twice.
+    return list(dict.fromkeys(found))
+
+
+def collect(paths, exts=None):
+    """Recursively collect file contents from paths."""
+    found = discover(paths, exts)
+    # Reads are I/O-bound, so overlapping them in threads hides most of the latency.
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as ex:
+        return dict(zip(found, ex.map(read_source, found)))
+
+
+def _positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
 
 
 def main(argv=None):
@@ -33,32 +78,48 @@ def main(argv=None):
         help="Output format (default: text)")
     ap.add_argument("--fail-on-warning", action="store_true",
         help="Exit 1 on warnings too, not just errors")
+    ap.add_argument("-j", "--jobs", type=_positive_int, default=None,
+        help="Worker processes for scanning code (default: CPU count)")
+    ap.add_argument("--cache-dir", default=default_cache_dir(),
+        help="Where parsed migrations are cached (default: %(default)s)")
+    ap.add_argument("--no-cache", action="store_true",
+        help="Always re-parse migrations; do not read or write the cache")
     args = ap.parse_args(argv)
 
     sqls = collect(args.migrations, {".sql"})
-    codes = collect(args.code, CODE_EXTS)
+    code_paths = discover(args.code, CODE_EXTS)
 
     changes = []
     for fname, content in sqls.items():
-        changes.extend(parse_migrations(content, fname))
-
-    violations = find_violations(changes, codes)
+        changes.extend(parse_migrations(content, fname, None if args.no_cache else args.cache_dir))
 
-    if args.format == "json":
-        print(to_json(violations))
-    elif args.format == "sarif":
-        print(json.dumps(to_sarif(violations), indent=2))
+    violations = iter_violations_paths(changes, code_paths, workers=args.jobs)
+    errs = warns = 0
+    if args.format in ("json", "sarif"):
+        violations = list(violations)
+        errs = sum(1 for v in violations if v.severity == "error")
+        warns = len(violations) - errs
+        if args.format == "json":
+            print(to_json(violations))
+        else:
+            # json.dump writes encoder chunks as they are produced instead of
+            # first building the whole SARIF document as one string.
+            json.dump(to_sarif(violations), sys.stdout, indent=2)
+            print()
     else:
+        # Text output streams: each violation is printed as soon as its file is scanned.
         for v in violations:
+            if v.severity == "error":
+                errs += 1
+            else:
+                warns += 1
             icon = "\u274c" if v.severity == "error" else "\u26a0\ufe0f"
             print(f"{icon} [{v.kind}] {v.table}.{v.column or '*'}")
             print(f"   migration: {v.migration_file}:{v.migration_line}")
             print(f"   code ref:  {v.code_file}:{v.code_line} \u2192 {v.snippet}")
-        if not violations:
+        if not errs and not warns:
             print("\u2705 No backward-incompatible references found.")
 
-    errs = sum(1 for v in violations if v.severity == "error")
-    warns = len(violations) - errs
     if errs:
         print(f"\n\U0001f4a5 {errs} error(s), {warns} warning(s)", file=sys.stderr)
         return 1
@@ -1,11 +1,21 @@
 """SafeAlter — zero-downtime migration cross-validator engine."""
+import mmap
+import os
 import re
+import sys
 import json
-from dataclasses import dataclass
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import lru_cache, partial
+from hashlib import blake2b
+from typing import List, Dict, Iterator, Optional, Tuple
 
+__version__ = "1.0.0"
+# Slotted instances are about half the size; slots= needs Python 3.10+.
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+
+@dataclass(**_SLOTS)
 class SchemaChange:
     kind: str
     table: str
@@ -15,7 +25,7 @@ class SchemaChange:
     severity: str = "error"
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Violation:
     kind: str
     table: str
@@ -41,42 +51,341 @@ DDL_RULES = [
         r"ALTER\s+TABLE\s+[`\"]?(\w+)[`\"]?\s+ALTER\s+COLUMN\s+[`\"]?(\w+)[`\"]?\s+(?:SET\s+DATA\s+)?TYPE", re.I)),
 ]
 _SQL_KW = re.compile(r"\b(SELECT|INSERT|UPDATE|DELETE|FROM|JOIN|WHERE)\b", re.I)
+_SQL_WORDS = ("select", "insert", "update", "delete", "from", "join", "where")
+_PARALLEL_MIN_FILES = 16
+_PRESCREEN_MAX_TARGETS = 32
+MMAP_MIN_SIZE = 256 * 1024
+IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def _build_ddl_scanner():
+    """Fuse DDL_RULES into one alternation; map each rule's outer group to its metadata."""
+    parts, meta, group = [], {}, 1
+    for kind, sev, pat in DDL_RULES:
+        parts.append(f"(?P<{kind}>{pat.pattern})")
+        meta[kind] = (sev, group + 1, group + 2 if pat.groups >= 2 else 0)
+        group += 1 + pat.groups
+    return re.compile("|".join(parts), re.I), meta
+
+
+_DDL_SCANNER, _DDL_META = _build_ddl_scanner()
+# Where one statement ends: a semicolon, a blank line, or a line that opens a
+# new statement. Rules are matched within a single statement so their \s+ and
+# [^;]*? runs cannot reach into the next one in files that omit semicolons.
+# ALTER/DROP only count when followed by an object keyword, so continuation
+# lines such as "  DROP COLUMN email" stay with their ALTER TABLE.
+_STMT_BREAK = re.compile(
+    r";|\n[ \t]*(?=\n)|\n(?=[ \t]*(?:ALTER\s+TABLE|DROP\s+(?:TABLE|INDEX|VIEW|SEQUENCE|SCHEMA|TYPE)"
+    r"|CREATE|INSERT|UPDATE|DELETE|SELECT|GRANT|REVOKE|TRUNCATE|COMMENT|BEGIN|COMMIT)\b)", re.I)
+# Quoted literals are matched first so a "--" inside one is not taken for a comment.
+_SQL_COMMENT = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*")
+# Cached parse results are only valid for the exact rule set that produced them.
+_CACHE_STAMP = blake2b(
+    f"{__version__}\0{_DDL_SCANNER.pattern}\0{_STMT_BREAK.pattern}\0{_SQL_COMMENT.pattern}".encode(),
+    digest_size=8).hexdigest()
+
+
+def default_cache_dir() -> str:
+    """Per-user parse cache location: $XDG_CACHE_HOME/safealter or ~/.cache/safealter."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "safealter")
+
+
+def parse_migrations(sql: str, filename: str = "migration.sql",
+                     cache_dir: Optional[str] = None) -> List[SchemaChange]:
+    """Extract backward-incompatible schema changes from SQL DDL text.
+
+    With cache_dir set, results are stored there keyed by a hash of the SQL
+    text, so unchanged migrations are not re-parsed on the next run.
+    """
+    if cache_dir:
+        digest = blake2b(sql.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+        path = os.path.join(cache_dir, f"{_CACHE_STAMP}-{digest}.json")
+        try:
+            with open(path, encoding="utf-8") as fh:
+                return [SchemaChange(**dict(d, table=sys.intern(d["table"]), column=sys.intern(d["column"]),
+                                            file=filename)) for d in json.load(fh)]
+        except (OSError, ValueError, TypeError, KeyError):
+            pass  # missing or malformed entry: treat as a miss and re-parse
+    changes = _parse(sql, filename)
+    if cache_dir:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump([asdict(c) for c in changes], fh)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+    return changes
+
+
+def _blank_comment(m: "re.Match[str]") -> str:
+    """Replace a -- comment with spaces of the same length; leave quoted literals alone."""
+    text = m.group()
+    return " " * len(text) if text.startswith("--") else text
+
+
+def _statements(sql: str) -> Iterator[Tuple[int, int]]:
+    """Yield the (start, end) offsets of each statement in sql."""
+    start = 0
+    for m in _STMT_BREAK.finditer(sql):
+        if m.start() > start:
+            yield start, m.start()
+        start = m.end()
+    if start < len(sql):
+        yield start, len(sql)
 
 
-def parse_migrations(sql: str, filename: str = "migration.sql") -> List[SchemaChange]:
-    """Extract backward-incompatible schema changes from SQL DDL text."""
+def _parse(sql: str, filename: str) -> List[SchemaChange]:
+    """Run the fused DDL scanner over each statement; the uncached body of parse_migrations."""
+    # Blank out comments in place so offsets, and so line numbers, are unchanged.
+    sql = _SQL_COMMENT.sub(_blank_comment, sql)
     changes = []
-    for lineno, line in enumerate(sql.splitlines(), 1):
-        for kind, sev, pat in DDL_RULES:
-            for m in pat.finditer(line):
-                col = m.group(2) if m.lastindex and m.lastindex >= 2 else ""
-                changes.append(SchemaChange(kind, m.group(1), col, filename, lineno, sev))
+    lineno, pos = 1, 0
+    for start, end in _statements(sql):
+        for m in _DDL_SCANNER.finditer(sql, start, end):
+            kind = m.lastgroup
+            sev, tbl, col = _DDL_META[kind]
+            lineno += sql.count("\n", pos, m.start())
+            pos = m.start()
+            # Interned names share one object across every change and violation
+            # that mentions them, and dict lookups on them short-circuit on identity.
+            changes.append(SchemaChange(kind, sys.intern(m.group(tbl)), sys.intern(m.group(col)) if col else "",
+                                        filename, lineno, sev))
     return changes
 
 
-def find_violations(changes: List[SchemaChange], code_files: Dict[str, str]) -> List[Violation]:
-    """Cross-validate schema changes against application code to find broken refs."""
+def _decode(buf) -> str:
+    """Decode file bytes; pure-ASCII input skips UTF-8 validation."""
+    try:
+        text = str(buf, "ascii")
+    except UnicodeDecodeError:
+        text = str(buf, "utf-8", "ignore")
+    if "\r" in text:  # keep read_text's universal-newline behaviour
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def read_source(path: str) -> str:
+    """Read one source file as text, dropping undecodable bytes.
+
+    Large files are memory-mapped and decoded straight from the page cache,
+    saving the intermediate bytes copy a read() would make.
+    """
+    with open(path, "rb", buffering=0) as fh:
+        if os.fstat(fh.fileno()).st_size < MMAP_MIN_SIZE:
+            return _decode(fh.read())
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return _decode(buf)
+
+
+def _has_sql_kw(text: str) -> bool:
+    """_SQL_KW.search, gated by plain substring tests that reject most text without the regex engine."""
+    if not text.isascii():
+        # casefold() and re.I disagree outside ASCII (İ, ı), so defer to the regex.
+        return _SQL_KW.search(text) is not None
+    low = text.casefold()
+    return any(k in low for k in _SQL_WORDS) and _SQL_KW.search(text) is not None
+
+
+def _ident_pattern(names) -> str:
+    """Regex source matching any of the given SQL identifiers as a whole word.
+
+    The names are folded into a prefix trie (users|user_id -> user(?:_id|s)),
+    so re tries each shared prefix once instead of once per alternative.
+    """
+    trie: dict = {}
+    for name in names:
+        node = trie
+        for c in name:
+            node = node.setdefault(c, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        alts = [re.escape(c) + emit(child) for c, child in sorted(node.items()) if c]
+        if "" in node:
+            return f"(?:{'|'.join(alts)})?" if alts else ""
+        return alts[0] if len(alts) == 1 else f"(?:{'|'.join(alts)})"
+
+    return r"\b" + emit(trie) + r"\b"
+
+
+@lru_cache(maxsize=None)
+def _ident_re(name: str) -> "re.Pattern[str]":
+    """Compiled whole-word matcher for one identifier, built once per process.
+
+    Identifiers come from migration DDL, so the cache stays small.
+    """
+    return re.compile(_ident_pattern([name]))
+
+
+def _scan_file(fpath: str, content: str, by_target: Dict[str, List[SchemaChange]],
+               ident_src: str) -> List[Violation]:
+    """Find references to the targeted identifiers in one code file.
+
+    Patterns travel as source strings so this can run in a worker process;
+    re's own compile cache makes the repeated re.compile calls cheap.
+    """
+    is_sql = fpath.endswith(".sql")
+    if not (is_sql or "'" in content or '"' in content or _has_sql_kw(content)):
+        return []
+    # A plain substring scan rejects most files far faster than the regex; past
+    # a few dozen targets one trie-regex pass is cheaper than that many scans.
+    if len(by_target) <= _PRESCREEN_MAX_TARGETS and not any(t in content for t in by_target):
+        return []
+    # Matches arrive in text order, so counting newlines since the previous
+    # hit numbers the lines in one forward pass with no offset index.
+    hits_by_line: Dict[int, Tuple[int, Dict[str, None]]] = {}
+    lineno, pos = 1, 0
+    for m in re.compile(ident_src).finditer(content):
+        lineno += content.count("\n", pos, m.start())
+        pos = m.start()
+        if lineno not in hits_by_line:
+            hits_by_line[lineno] = (content.rfind("\n", 0, pos) + 1, {})
+        hits_by_line[lineno][1][m.group()] = None
     violations = []
+    table_seen: Dict[str, bool] = {}
+    for lineno, (start, hits) in hits_by_line.items():
+        end = content.find("\n", start)
+        line = content[start:end if end >= 0 else len(content)]
+        if not (is_sql or "'" in line or '"' in line or _has_sql_kw(line)):
+            continue
+        snippet = line.strip()
+        for target in hits:
+            for ch in by_target[target]:
+                if ch.kind != "drop_table":
+                    if ch.table not in table_seen:
+                        table_seen[ch.table] = (ch.table in content
+                                                and _ident_re(ch.table).search(content) is not None)
+                    if not table_seen[ch.table]:
+                        continue
+                violations.append(Violation(
+                    ch.kind, ch.table, ch.column, ch.file, ch.line, fpath, lineno, snippet, ch.severity))
+    return violations
+
+
+def _scan_chunk(by_target: Dict[str, List[SchemaChange]], ident_src: str,
+                files: List[Tuple[str, str]]) -> List[Violation]:
+    """Scan a bucket of (path, content) pairs; the unit of work for a pool worker."""
+    return [v for fpath, content in files for v in _scan_file(fpath, content, by_target, ident_src)]
+
+
+def _plan(changes: List[SchemaChange]) -> Tuple[Dict[str, List[SchemaChange]], str]:
+    """Index changes by the identifier they invalidate and build the matcher for them."""
+    # Changes sharing an identifier (e.g. a rename and a type change of the
+    # same column) are grouped so each identifier is matched only once.
+    by_target: Dict[str, List[SchemaChange]] = {}
     for ch in changes:
+        target = ch.table if ch.kind == "drop_table" else ch.column
+        if target:
+            by_target.setdefault(target, []).append(ch)
+    # One pattern over every target identifier: each file is scanned once
+    # regardless of how many changes there are.
+    return by_target, _ident_pattern(by_target)
+
+
+def _scan_paths(by_target: Dict[str, List[SchemaChange]], ident_src: str,
+                paths: List[str]) -> List[Violation]:
+    """Read and scan a bucket of files inside a pool worker."""
+    return [v for p in paths for v in _scan_file(p, read_source(p), by_target, ident_src)]
+
+
+def _pool_size(workers: Optional[int], n_files: int) -> int:
+    """Process count for scanning n_files, or 0 when the scan should stay serial.
+
+    None means one per CPU; a single worker or fewer than _PARALLEL_MIN_FILES
+    files is not worth the process start-up.
+    """
+    workers = workers or os.cpu_count() or 1
+    return workers if workers > 1 and n_files >= _PARALLEL_MIN_FILES else 0
+
+
+def _scan_parallel(task, items: list, workers: Optional[int]) -> Iterator[List[Violation]]:
+    """Fan items out over a process pool in buckets, yielding each bucket's result in order."""
+    workers = workers or os.cpu_count() or 1
+    # A few contiguous buckets per worker balance uneven file sizes while the
+    # change index is pickled once per bucket instead of once per file.
+    size = -(-len(items) // (workers * 4))
+    buckets = [items[i:i + size] for i in range(0, len(items), size)]
+    # fork starts every worker up front, so never ask for more than there are buckets.
+    with ProcessPoolExecutor(max_workers=min(workers, len(buckets))) as ex:
+        yield from ex.map(task, buckets)
+
+
+def iter_violations(changes: List[SchemaChange], code_files: Dict[str, str],
+                    workers: Optional[int] = None) -> Iterator[Violation]:
+    """Yield violations file by file as they are found, without building the full list.
+
+    Files are scanned in up to `workers` processes (default: CPU count) once
+    there are at least _PARALLEL_MIN_FILES of them; smaller inputs stay serial.
+    """
+    by_target, ident_src = _plan(changes)
+    if not by_target:
+        return
+    workers = _pool_size(workers, len(code_files))
+    if not workers:
         for fpath, content in code_files.items():
-            for ln, line in enumerate(content.splitlines(), 1):
-                if not (fpath.endswith(".sql") or _SQL_KW.search(line) or "'" in line or '"' in line):
-                    continue
-                if ch.kind == "drop_table" and re.search(r"\b" + re.escape(ch.table) + r"\b", line):
-                    violations.append(Violation(
-                        ch.kind, ch.table, "", ch.file, ch.line, fpath, ln, line.strip(), ch.severity))
-                elif ch.column and re.search(r"\b" + re.escape(ch.column) + r"\b", line):
-                    if re.search(r"\b" + re.escape(ch.table) + r"\b", content):
-                        violations.append(Violation(
-                            ch.kind, ch.table, ch.column, ch.file, ch.line, fpath, ln, line.strip(), ch.severity))
-    return violations
+            yield from _scan_file(fpath, content, by_target, ident_src)
+    else:
+        task = partial(_scan_chunk, by_target, ident_src)
+        for found in _scan_parallel(task, list(code_files.items()), workers):
+            yield from found
+
+
+def find_violations(changes: List[SchemaChange], code_files: Dict[str, str],
+                    workers: Optional[int] = None) -> List[Violation]:
+    """Cross-validate schema changes against application code to find broken refs."""
+    return list(iter_violations(changes, code_files, workers))
+
+
+def find_violations_parallel(changes: List[SchemaChange], code_files: Dict[str, str],
+                             workers: Optional[int] = None) -> List[Violation]:
+    """find_violations that always uses a process pool unless there are fewer than 4 files."""
+    by_target, ident_src = _plan(changes)
+    if not by_target:
+        return []
+    if len(code_files) < 4:
+        return _scan_chunk(by_target, ident_src, list(code_files.items()))
+    task = partial(_scan_chunk, by_target, ident_src)
+    return [v for found in _scan_parallel(task, list(code_files.items()), workers) for v in found]
+
+
+def iter_violations_paths(changes: List[SchemaChange], paths: List[str],
+                          workers: Optional[int] = None) -> Iterator[Violation]:
+    """iter_violations over files on disk rather than preloaded contents.
+
+    Pool workers read their own files, so file contents are never pickled
+    across processes and large files stay in the shared page cache.
+    """
+    by_target, ident_src = _plan(changes)
+    if not by_target:
+        return
+    workers = _pool_size(workers, len(paths))
+    if not workers:
+        with ThreadPoolExecutor(max_workers=IO_WORKERS) as io:
+            for path, content in zip(paths, io.map(read_source, paths)):
+                yield from _scan_file(path, content, by_target, ident_src)
+    else:
+        for found in _scan_parallel(partial(_scan_paths, by_target, ident_src), list(paths), workers):
+            yield from found
+
+
+def find_violations_paths(changes: List[SchemaChange], paths: List[str],
+                          workers: Optional[int] = None) -> List[Violation]:
+    """find_violations over files on disk; see iter_violations_paths."""
+    return list(iter_violations_paths(changes, paths, workers))
+
+
+# Shared per-rule SARIF ids, so results don't each format and hold their own copy.
+_RULE_IDS = {kind: f"safealter/{kind}" for kind, _, _ in DDL_RULES}
 
 
 def to_sarif(violations: List[Violation]) -> dict:
     """Convert violations to SARIF 2.1.0 format for GitHub Security integration."""
     return {"version": "2.1.0", "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
-            "runs": [{"tool": {"driver": {"name": "SafeAlter", "version": "1.0.0"}}, "results": [{
-                "ruleId": f"safealter/{v.kind}", "level": "error" if v.severity == "error" else "warning",
+            "runs": [{"tool": {"driver": {"name": "SafeAlter", "version": __version__}}, "results": [{
+                "ruleId": _RULE_IDS.get(v.kind) or f"safealter/{v.kind}", "level": "error" if v.severity == "error" else "warning",
                 "message": {"text": f"{v.kind}: {v.table}.{v.column or '*'} still referenced at {v.code_file}:{v.code_line}"},
                 "locations": [{"physicalLocation": {"artifactLocation": {"uri": v.code_file},
                     "region": {"startLine": v.code_line}}}],
@@ -1,6 +1,7 @@
-"""Tests for SafeAlter — 13 test cases covering parse, cross-validate, and output."""
+"""Tests for SafeAlter — 29 test cases covering parse, cross-validate, and output."""
 import json
-from safealter import parse_migrations, find_violations, to_sarif, to_json
+from safealter import (parse_migrations, find_violations, find_violations_parallel, find_violations_paths,
+                       to_sarif, to_json)
 
 
 def test_detect_drop_column():
@@ -102,3 +103,168 @@ def test_quoted_identifiers():
     assert len(changes) == 1
     assert changes[0].table == "users"
     assert changes[0].column == "email"
+
+
+def test_multiline_statement_reports_first_line():
+    sql = "-- rename\nALTER TABLE products\n    RENAME COLUMN price TO cost;\nDROP TABLE x;"
+    changes = parse_migrations(sql, "V9.sql")
+    assert [(c.kind, c.line) for c in changes] == [("rename_column", 2), ("drop_table", 4)]
+    assert changes[0].column == "price"
+
+
+def test_parallel_scan_matches_serial():
+    changes = parse_migrations("ALTER TABLE users DROP COLUMN email;\nDROP TABLE orders;", "V1.sql")
+    code = {f"m{i}.py": f"q = 'SELECT email FROM users'\nn = {i}\nr = \"SELECT * FROM orders\"" for i in range(20)}
+    serial = find_violations(changes, code, workers=1)
+    assert len(serial) == 40
+    assert find_violations(changes, code, workers=2) == serial
+    assert find_violations_parallel(changes, code, workers=3) == serial
+
+
+def test_single_cpu_default_stays_serial(monkeypatch, tmp_path):
+    import safealter
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool started on a 1-CPU host")
+
+    monkeypatch.setattr(safealter.os, "cpu_count", lambda: 1)
+    monkeypatch.setattr(safealter, "ProcessPoolExecutor", no_pool)
+    changes = parse_migrations("DROP TABLE orders;", "V2.sql")
+    code = {f"q{i}.sql": "SELECT * FROM orders;" for i in range(20)}
+    assert len(find_violations(changes, code)) == 20
+    paths = []
+    for name, content in code.items():
+        (tmp_path / name).write_text(content)
+        paths.append(str(tmp_path / name))
+    assert len(find_violations_paths(changes, paths)) == 20
+
+
+def test_pool_is_not_larger_than_bucket_count(monkeypatch):
+    import safealter
+    from concurrent.futures import ThreadPoolExecutor
+
+    sizes = []
+
+    def spy_pool(max_workers):
+        sizes.append(max_workers)
+        return ThreadPoolExecutor(max_workers)
+
+    monkeypatch.setattr(safealter, "ProcessPoolExecutor", spy_pool)
+    changes = parse_migrations("DROP TABLE orders;", "V2.sql")
+    code = {f"q{i}.sql": "SELECT * FROM orders;" for i in range(16)}
+    assert len(find_violations(changes, code, workers=64)) == 16
+    assert sizes == [16]
+
+
+def test_parse_cache_round_trip(tmp_path, monkeypatch):
+    import safealter
+
+    sql = "ALTER TABLE users DROP COLUMN email;\nDROP TABLE orders;"
+    first = parse_migrations(sql, "V1.sql", cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+
+    def no_parse(*args):
+        raise AssertionError("cache miss: migration was re-parsed")
+
+    monkeypatch.setattr(safealter, "_parse", no_parse)
+    cached = parse_migrations(sql, "renamed.sql", cache_dir=str(tmp_path))
+    assert [(c.kind, c.table, c.column, c.line) for c in cached] == \
+        [(c.kind, c.table, c.column, c.line) for c in first]
+    assert {c.file for c in cached} == {"renamed.sql"}
+
+
+def test_malformed_cache_entry_is_a_miss(tmp_path):
+    sql = "DROP TABLE orders;"
+    parse_migrations(sql, "V2.sql", cache_dir=str(tmp_path))
+    entry, = tmp_path.iterdir()
+    entry.write_text('[{"kind": "drop_table"}]')
+    changes = parse_migrations(sql, "V2.sql", cache_dir=str(tmp_path))
+    assert [(c.kind, c.table) for c in changes] == [("drop_table", "orders")]
+
+
+def test_paths_scan_reads_files_itself(tmp_path):
+    changes = parse_migrations("DROP TABLE orders;", "V2.sql")
+    code = {}
+    for i in range(20):
+        path = tmp_path / f"q{i}.sql"
+        path.write_text(f"-- {i}\nSELECT * FROM orders;")
+        code[str(path)] = path.read_text()
+    expected = find_violations(changes, code, workers=1)
+    assert len(expected) == 20
+    assert find_violations_paths(changes, list(code), workers=1) == expected
+    assert find_violations_paths(changes, list(code), workers=2) == expected
+
+
+def test_statements_without_semicolons_stay_separate():
+    sql = ("ALTER TABLE users ADD COLUMN nickname TEXT\n"
+           "ALTER TABLE users DROP COLUMN email\n"
+           "ALTER TABLE users ADD COLUMN age INT NOT NULL")
+    changes = parse_migrations(sql, "V10.sql")
+    assert [(c.kind, c.column, c.line) for c in changes] == \
+        [("drop_column", "email", 2), ("not_null_no_default", "age", 3)]
+
+
+def test_commented_line_does_not_swallow_next_statement():
+    changes = parse_migrations("-- ALTER TABLE users\nDROP TABLE x;", "V11.sql")
+    assert [(c.kind, c.table, c.line) for c in changes] == [("drop_table", "x", 2)]
+
+
+def test_double_dash_inside_string_literal_is_not_a_comment():
+    sql = "UPDATE settings SET sep = '--'; ALTER TABLE users DROP COLUMN email;"
+    assert [(c.kind, c.column) for c in parse_migrations(sql, "V14.sql")] == [("drop_column", "email")]
+    sql = "INSERT INTO t VALUES ('a--b'); DROP TABLE sessions;"
+    assert [(c.kind, c.table) for c in parse_migrations(sql, "V15.sql")] == [("drop_table", "sessions")]
+
+
+def test_not_null_does_not_reach_into_next_statement():
+    sql = "ALTER TABLE t1 ADD COLUMN c INT\nCREATE TABLE z (a INT NOT NULL);"
+    assert parse_migrations(sql, "V12.sql") == []
+
+
+def test_alter_continuation_line_still_matches():
+    changes = parse_migrations("ALTER TABLE users\n    DROP COLUMN email;", "V13.sql")
+    assert [(c.kind, c.table, c.column, c.line) for c in changes] == [("drop_column", "users", "email", 1)]
+
+
+def test_keyword_glued_to_non_ascii_letter_is_not_sql():
+    changes = parse_migrations("ALTER TABLE users DROP COLUMN email;", "V1.sql")
+    code = {"app.py": "x = \u00e9from + users.email"}
+    assert find_violations(changes, code) == []
+
+
+def test_non_ascii_case_folds_match_like_the_regex():
+    from safealter import _SQL_KW, _has_sql_kw
+
+    for text in ("İNSERT INTO orders", "a JOİN orders", "ınsert into orders"):
+        assert _SQL_KW.search(text)
+        assert _has_sql_kw(text)
+
+
+def test_walk_skips_unreadable_directories(tmp_path, monkeypatch):
+    import main
+
+    (tmp_path / "locked").mkdir()
+    (tmp_path / "locked" / "x.py").write_text("SELECT 1")
+    (tmp_path / "ok.py").write_text("SELECT 1")
+    real_scandir = main.os.scandir
+
+    def scandir(path):
+        if path.endswith("locked"):
+            raise PermissionError(13, "Permission denied", path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(main.os, "scandir", scandir)
+    assert list(main._walk(str(tmp_path), main.CODE_EXTS)) == [str(tmp_path / "ok.py")]
+
+
+def test_cli_overlapping_code_paths_scan_each_file_once(tmp_path, capsys):
+    import main
+
+    (tmp_path / "mig.sql").write_text("ALTER TABLE users DROP COLUMN email;")
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "app.py").write_text("q = 'SELECT email FROM users'")
+    argv = ["-m", str(tmp_path / "mig.sql"), "-c", str(src), str(src / "app.py"), str(src),
+            "-f", "json", "--no-cache"]
+    assert main.main(argv) == 1
+    assert len(json.loads(capsys.readouterr().out)) == 1